@@ -0,0 +1,356 @@
+import asyncio
+import time
+
+from decimal import Decimal
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+from urllib.parse import urlencode
+
+import aiohttp
+import orjson
+
+from . import schemas
+from .api import (
+    _ACCOUNT_MAX_AGE,
+    _ACCOUNT_PARAMS,
+    _buy_params,
+    _check_params,
+    _check_status,
+    _clean_params,
+    _delete_params,
+    _format_ids,
+    _get_account_fields,
+    _getcount_params,
+    _getcountry_params,
+    _getprice_params,
+    _getproxy_params,
+    _prolong_params,
+    _setdescr_params,
+    _settype_params,
+)
+from .types import (
+    Account,
+    Purchase,
+    PriceInformation,
+    Prolongation,
+    Proxy,
+    ProxyState,
+    ProxyType,
+    ProxyVersion,
+)
+
+
+class AsyncProxy6:
+    """
+    Asynchronous counterpart of :class:`proxy6.api.Proxy6`, allowing many API
+    calls to be in flight concurrently. Must be used as an async context
+    manager so that the underlying HTTP session gets closed.
+    """
+
+    def __init__(self, api_key: str):
+        self._base_path = f'/api/{api_key}/'
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._account_fields = None
+        self._account_updated_at = 0.0
+
+    async def __aenter__(self) -> 'AsyncProxy6':
+        self._session = aiohttp.ClientSession(
+            base_url='https://proxy6.net',
+            connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=75),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._session.close()
+        self._session = None
+
+    async def _request(self, method: str, *, params: Optional[dict] = None) -> dict:
+        url = self._base_path + method
+        if params:
+            # encode like requests does, aiohttp rejects booleans as query values
+            url += '?' + urlencode(params)
+
+        async with self._session.get(url) as response:
+            assert response.status == 200  # TODO: handle other cases
+
+            data = orjson.loads(await response.read())
+
+        data = _check_status(data)
+
+        if 'user_id' in data:
+            self._account_fields = _get_account_fields(data)
+            self._account_updated_at = time.monotonic()
+
+        return data
+
+    async def get_account(self) -> Account:
+        """
+        Get account information, taken from the last response when received
+        less than 5 seconds ago
+
+        :returns: account information
+
+        :raises Proxy6Error:
+        """
+        if (
+            self._account_fields is not None
+            and time.monotonic() - self._account_updated_at < _ACCOUNT_MAX_AGE
+        ):
+            user_id, balance, currency = self._account_fields
+        else:
+            # every response holds account information, pick a small one
+            data = await self._request('getprice', params=_ACCOUNT_PARAMS)
+            user_id, balance, currency = _get_account_fields(data)
+
+        return Account(
+            user_id=int(user_id), balance=Decimal(balance), currency=currency
+        )
+
+    async def get_price(
+        self, *, count: int, period: int, version: Optional[ProxyVersion] = None
+    ) -> PriceInformation:
+        """
+        Used to get information about the cost of the order, depending on the
+        period and number of proxies
+
+        :param count: Number of proxies
+        :param period: Number of days
+        :param version: Proxy version (default is IPv6)
+
+        :returns: price data
+
+        :raises Proxy6Error:
+        """
+        params = _getprice_params(count, period, version)
+        data = await self._request('getprice', params=params)
+
+        return schemas.load_price_information(data)
+
+    async def gather_prices(
+        self, requests: Iterable[Mapping]
+    ) -> List[PriceInformation]:
+        """
+        Get price information for several orders concurrently
+
+        :param requests: keyword arguments for each :meth:`get_price` call
+
+        :returns: price data, in the same order as requests
+
+        :raises Proxy6Error:
+        """
+        return await asyncio.gather(
+            *(self.get_price(**request) for request in requests)
+        )
+
+    async def get_count(
+        self, *, country: str, version: Optional[ProxyVersion] = None
+    ) -> int:
+        """
+        Get information about the amount of proxies available to purchase for
+        a selected country
+
+        :param country: Country code in ISO2 format
+        :param version: Proxy version (default is IPv6)
+
+        :returns: available amount of proxies
+
+        :raises Proxy6Error:
+        """
+        params = _getcount_params(country, version)
+        data = await self._request('getcount', params=params)
+
+        return data['count']
+
+    async def get_countries(
+        self, *, version: Optional[ProxyVersion] = None
+    ) -> List[str]:
+        """
+        Get information on available for proxies purchase countries
+
+        :param version: Proxy version (default is IPv6)
+
+        :returns: list of country codes in ISO2 format
+
+        :raises Proxy6Error:
+        """
+        params = _getcountry_params(version)
+        data = await self._request('getcountry', params=params)
+
+        return data['list']
+
+    async def get_proxies(
+        self, *, state: Optional[ProxyState] = None, description: Optional[str] = None
+    ) -> Sequence[Proxy]:
+        """
+        Get the list of proxies
+
+        :param state: filter proxies by state
+        :param description: filter proxies by technical comment
+
+        :returns: list of proxies
+
+        :raises Proxy6Error:
+        """
+        params = _getproxy_params(state, description)
+        data = await self._request('getproxy', params=params)
+
+        proxies = [schemas.load_proxy(proxy) for proxy in data['list']]
+
+        assert len(proxies) == data['list_count']
+        if description is not None:
+            assert all(proxy.description == description for proxy in proxies)
+
+        return proxies
+
+    async def set_type(self, *, proxies: Iterable[Proxy], type: ProxyType) -> None:
+        """
+        Change the protocol type of proxies
+
+        :param proxies: proxies to set the protocol for
+        :param type: new proxy type
+
+        :raises Proxy6Error:
+        """
+        params = _settype_params(_format_ids(proxies), type)
+        await self._request('settype', params=params)
+
+    async def set_description(
+        self,
+        *,
+        new: str,
+        old: Optional[str] = None,
+        proxies: Optional[Iterable[Proxy]] = None,
+    ) -> int:
+        """
+        Update technical comments in the proxy list that was added when buying
+
+        :param proxies: proxies to set the description for
+        :param new: new description
+        :param old: technical comments to be changed, maximum 50 characters
+
+        :returns: amount of proxies that were changed
+
+        :raises Proxy6Error:
+        """
+        assert old is None or len(old) <= 50
+
+        params = _setdescr_params(
+            new, old, None if proxies is None else _format_ids(proxies)
+        )
+        return (await self._request('setdescr', params=params)).pop('count')
+
+    async def buy(
+        self,
+        *,
+        count: int,
+        period: int,
+        country: str,
+        version: Optional[ProxyVersion] = None,
+        type: Optional[ProxyType] = None,
+        description: str = "",
+        auto_renew: bool = False,
+    ) -> Purchase:
+        """
+        Buy proxies
+
+        :param count: amount of proxies to purchase
+        :param period: period for which proxies are purchased in days
+        :param country: country in ISO2 format
+        :param version: proxy version, defaults to IPv6
+        :param type: proxy protocol
+        :param description: technical comment for proxies list, max 50 characters
+        :param auto_renew: enable auto-renewal for purchased proxies
+
+        :returns: purchase information
+
+        :raises Proxy6Error:
+        """
+        assert len(description) <= 50
+
+        params = _buy_params(
+            count,
+            period,
+            country,
+            version,
+            type,
+            description or None,
+            auto_renew or None,
+        )
+        data = await self._request('buy', params=params)
+        return schemas.load_purchase(data, description=description)
+
+    async def prolong(self, *, period: int, proxies: Iterable[Proxy]) -> Prolongation:
+        """
+        Extend existing proxies period
+
+        :param period: extension of the period in days
+        :param proxies: proxies to prolong
+
+        :returns: prolongation information
+
+        :raises Proxy6Error:
+        """
+        proxies = tuple(proxies)
+
+        params = _prolong_params(period, _format_ids(proxies))
+        return schemas.load_prolongation(
+            await self._request('prolong', params=params), proxies
+        )
+
+    async def delete(self, *, proxies: Iterable[Proxy]) -> int:
+        """
+        Delete proxies
+
+        :param proxies: proxies to delete
+
+        :returns: amount of proxies deleted
+
+        :raises Proxy6Error:
+        """
+        params = _delete_params(_format_ids(proxies))
+        return (await self._request('delete', params=params))['count']
+
+    async def delete_by_description(self, *, description: str) -> int:
+        """
+        Delete proxies having the given description
+
+        :param description: description to select proxies with
+
+        :returns: amount of proxies deleted
+
+        :raises Proxy6Error:
+        """
+        params = _clean_params({'descr': description})
+        return (await self._request('delete', params=params))['count']
+
+    async def is_proxy_valid(self, *, proxy_id: int) -> bool:
+        """
+        Checks the validity of a proxy
+
+        :param proxy_id: proxy identifier
+
+        :returns: proxy validity status
+
+        :raises Proxy6Error:
+        """
+        params = _check_params(proxy_id)
+        data = await self._request('check', params=params)
+        assert data['proxy_id'] == proxy_id
+
+        return data['proxy_status']
+
+    async def are_proxies_valid(self, *, proxy_ids: Iterable[int]) -> Dict[int, bool]:
+        """
+        Checks the validity of several proxies concurrently
+
+        :param proxy_ids: proxies identifiers
+
+        :returns: validity status of each proxy
+
+        :raises Proxy6Error:
+        """
+        proxy_ids = tuple(proxy_ids)
+        statuses = await asyncio.gather(
+            *(self.is_proxy_valid(proxy_id=proxy_id) for proxy_id in proxy_ids)
+        )
+
+        return dict(zip(proxy_ids, statuses))
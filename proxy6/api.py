@@ -1,12 +1,18 @@
-import copy
-import enum
+import functools
+import operator
+import time
 
 from decimal import Decimal
-from typing import Iterable, List, Optional, Sequence
-from urllib.parse import urljoin
+from typing import Callable, Collection, Iterable, Iterator, List, Optional, Sequence
+from urllib.parse import urlencode
 
+import ijson
+import orjson
 import requests
 
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 from . import errors, schemas
 from .types import (
     Account,
@@ -19,63 +25,330 @@ from .types import (
     ProxyVersion,
 )
 
+_METHODS = (
+    'getprice',
+    'getcount',
+    'getcountry',
+    'getproxy',
+    'settype',
+    'setdescr',
+    'buy',
+    'prolong',
+    'delete',
+    'check',
+)
+
+# every method, including purchases, is a GET: read errors are never retried since
+# Proxy6 may already have processed the request
+_RETRY = Retry(
+    total=3,
+    read=0,
+    status_forcelist=(502, 503),
+    backoff_factor=0.3,
+    raise_on_status=False,
+)
+# a gateway error may follow a processed order, retry purchases on connect errors only
+_PURCHASE_RETRY = _RETRY.new(status_forcelist=())
+_PURCHASE_METHODS = ('buy', 'prolong')
+
+# age under which account information of the last response is still used
+_ACCOUNT_MAX_AGE = 5
+
+_get_account_fields = operator.itemgetter('user_id', 'balance', 'currency')
+
+
+def _clean_params(params: dict) -> dict:
+    return {k: v for k, v in params.items() if v is not None}
+
+
+def _make_params_builder(
+    *keys: str,
+    optional: Collection[str] = (),
+    enums: Collection[str] = (),
+    constants: Optional[dict] = None,
+) -> Callable[..., dict]:
+    """
+    Generate a function building query parameters out of positional arguments
+    named after `keys`, a version of `_clean_params` specialized for a given
+    API method
+
+    :param keys: parameters names
+    :param optional: parameters omitted when `None`
+    :param enums: parameters given as integer enum members, sent by value since
+        their `str` is only their value from Python 3.11
+    :param constants: parameters always sent with the same value
+    """
+    lines = [f"def build({', '.join(keys)}):", "    params = {}"]
+
+    for key in keys:
+        value = f'{key}.value' if key in enums else key
+        if key in optional:
+            lines.append(f'    if {key} is not None:')
+            lines.append(f'        params[{key!r}] = {value}')
+        else:
+            lines.append(f'    params[{key!r}] = {value}')
 
-def _clean_params(**kwargs) -> dict:
-    return {
-        k: (v.value if isinstance(v, enum.Enum) else v)
-        for k, v in kwargs.items()
-        if v is not None
-    }
+    for key, value in (constants or {}).items():
+        lines.append(f'    params[{key!r}] = {value!r}')
+
+    lines.append('    return params')
+
+    namespace = {}
+    exec(compile('\n'.join(lines) + '\n', '<params builder>', 'exec'), namespace)
+
+    return namespace['build']
+
+
+_getprice_params = _make_params_builder(
+    'count', 'period', 'version', optional={'version'}, enums={'version'}
+)
+_getcount_params = _make_params_builder(
+    'country', 'version', optional={'version'}, enums={'version'}
+)
+_getcountry_params = _make_params_builder(
+    'version', optional={'version'}, enums={'version'}
+)
+_getproxy_params = _make_params_builder(
+    'state', 'descr', optional={'state', 'descr'}, constants={'nokey': True}
+)
+_settype_params = _make_params_builder('ids', 'type')
+_setdescr_params = _make_params_builder('new', 'old', 'ids', optional={'old', 'ids'})
+_buy_params = _make_params_builder(
+    'count',
+    'period',
+    'country',
+    'version',
+    'type',
+    'descr',
+    'auto_prolong',
+    optional={'version', 'type', 'descr', 'auto_prolong'},
+    enums={'version'},
+    constants={'nokey': True},
+)
+_prolong_params = _make_params_builder('period', 'ids')
+_delete_params = _make_params_builder('ids')
+_check_params = _make_params_builder('ids')
+
+# parameters of the smallest price request, used to get account information
+_ACCOUNT_PARAMS = _getprice_params(1, 7, None)
+
+
+def _format_ids(proxies: Iterable[Proxy]) -> str:
+    """Format proxies ids for Proxy6's non-standard GET query parameters format"""
+    return ','.join([str(proxy.id) for proxy in proxies])
+
+
+def _check_status(data: dict) -> dict:
+    """Strip the `'status'` field of a response, raising the error it reports"""
+    if data.pop('status') != 'yes':
+        raise errors.select(data)
+
+    return data
+
+
+_SCALAR_EVENTS = frozenset(('null', 'boolean', 'integer', 'double', 'number', 'string'))
+
+
+def _read_fields(data: dict, events: Iterator) -> bool:
+    """
+    Read top-level scalar fields of parsing events into `data`, up to the start
+    of the `'list'` array
+
+    :returns: whether the array was reached
+    """
+    for prefix, event, value in events:
+        if prefix == 'list' and event == 'start_array':
+            return True
+        if prefix and '.' not in prefix and event in _SCALAR_EVENTS:
+            data[prefix] = value
+
+    return False
+
+
+def _stream_items(
+    response: requests.Response,
+    events: Iterator,
+    data: dict,
+    complete: Callable[[dict], None],
+) -> Iterator:
+    """
+    Build items of the `'list'` array as they are consumed, then read fields
+    following it into `data`
+    """
+    try:
+        builder = None
+        for prefix, event, value in events:
+            if prefix == 'list':  # end of the array
+                break
+
+            if builder is None:
+                if prefix == 'list.item' and event in _SCALAR_EVENTS:
+                    yield value
+                    continue
+                builder = ijson.ObjectBuilder()
+
+            builder.event(event, value)
+            if prefix == 'list.item' and event in ('end_map', 'end_array'):
+                yield builder.value
+                builder = None
+
+        _read_fields(data, events)
+    finally:
+        response.close()
+
+    if 'status' in data:  # followed the list
+        _check_status(data)
+    complete(data)
+
+
+def _parse_streamed(
+    response: requests.Response, complete: Callable[[dict], None]
+) -> dict:
+    """
+    Parse a streamed response, stripping its `'status'` like `_check_status`.
+    The `'list'` array is given as an iterator decoding items as they are
+    consumed, fields following it are added once it is exhausted.
+
+    :param complete: called with data once every field has been read
+    """
+    response.raw.decode_content = True
+    events = ijson.parse(response.raw, use_float=True)
+
+    data = {}
+    if not _read_fields(data, events):
+        response.close()
+        data = _check_status(data)
+        complete(data)
+        return data
 
+    if 'status' in data:  # otherwise checked once the list is exhausted
+        _check_status(data)
 
-def _format_list_param(items: list) -> str:
-    """Format list for Proxy6's non-standard GET query parameters format"""
-    return ','.join(map(str, items))
+    data['list'] = _stream_items(response, events, data, complete)
+    return data
+
+
+def _cached(ttl: float, copy: Optional[Callable] = None):
+    """
+    Cache the results of a client method for `ttl` seconds, depending on the
+    keyword arguments it was called with
+
+    :param copy: called on results handed to callers, for mutable ones
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, **kwargs):
+            key = (method.__name__, frozenset(kwargs.items()))
+            now = time.monotonic()
+
+            cached = self._cache.get(key)
+            if cached is not None and now < cached[0]:
+                result = cached[1]
+            else:
+                # drop expired entries so the cache does not grow with arguments,
+                # iterating over a copy since other threads may update the cache
+                for k, (expires_at, _) in list(self._cache.items()):
+                    if expires_at <= now:
+                        self._cache.pop(k, None)
+
+                result = method(self, **kwargs)
+                self._cache[key] = (now + ttl, result)
+
+            return result if copy is None else copy(result)
+
+        return wrapper
+
+    return decorator
 
 
 class Proxy6:
     def __init__(self, api_key: str):
         self._base_url = f'https://proxy6.net/api/{api_key}/'
+        self._endpoints = {method: self._base_url + method for method in _METHODS}
         self._session = requests.Session()
+        # keep enough connections alive for the client to be shared by threads
+        self._session.mount(
+            'https://', HTTPAdapter(pool_maxsize=32, max_retries=_RETRY)
+        )
+        purchase_adapter = HTTPAdapter(pool_maxsize=32, max_retries=_PURCHASE_RETRY)
+        for method in _PURCHASE_METHODS:
+            self._session.mount(self._endpoints[method], purchase_adapter)
+        self._cache = {}
+        self._account_fields = None
+        self._account_updated_at = 0.0
+
+    def __enter__(self) -> 'Proxy6':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the connections kept alive by the client"""
+        self._session.close()
+
+    def _request(
+        self, method: str, *, params: Optional[dict] = None, stream: bool = False
+    ) -> dict:
+        """
+        Call an API method, returning response data stripped from its `'status'`
 
-    def _request(self, method: str, *, params: Optional[dict] = None) -> dict:
-        url = urljoin(self._base_url, method)
-        response = self._session.get(url, params=params)
+        :param stream: stream the response, see `_parse_streamed`
+        """
+        url = self._endpoints.get(method) or self._base_url + method
+        if params:
+            # encode once with urlencode, as requests would
+            url += '?' + urlencode(params)
+
+        response = self._session.get(url, stream=stream)
 
         assert response.ok  # TODO: handle other cases
 
-        data = response.json()
-        if data.pop('status') != 'yes':
-            raise errors.select(data)
+        if stream:
+            return _parse_streamed(response, self._record_account)
+
+        data = _check_status(orjson.loads(response.content))
+        self._record_account(data)
 
         return data
 
-    @staticmethod
-    def _pop_common_fields(data: dict):
-        for key in ('user_id', 'balance', 'currency'):
-            del data[key]
+    def _record_account(self, data: dict) -> None:
+        """Keep account information of a response, see `get_account`"""
+        if 'user_id' in data:
+            self._account_fields = _get_account_fields(data)
+            self._account_updated_at = time.monotonic()
 
     def get_account(self) -> Account:
         """
-        Get account information
+        Get account information, taken from the last response when received
+        less than 5 seconds ago
 
         :returns: account information
 
         :raises Proxy6Error:
         """
-        data = self._request('getcountry')
+        if (
+            self._account_fields is not None
+            and time.monotonic() - self._account_updated_at < _ACCOUNT_MAX_AGE
+        ):
+            user_id, balance, currency = self._account_fields
+        else:
+            # every response holds account information, pick a small one
+            data = self._request('getprice', params=_ACCOUNT_PARAMS)
+            user_id, balance, currency = _get_account_fields(data)
+
         return Account(
-            user_id=int(data['user_id']),
-            balance=Decimal(data['balance']),
-            currency=data['currency'],
+            user_id=int(user_id), balance=Decimal(balance), currency=currency
         )
 
+    @_cached(ttl=300)
     def get_price(
         self, *, count: int, period: int, version: Optional[ProxyVersion] = None
     ) -> PriceInformation:
         """
         Used to get information about the cost of the order, depending on the
-        period and number of proxies
+        period and number of proxies. Results are cached for 5 minutes.
 
         :param count: Number of proxies
         :param period: Number of days
@@ -85,15 +358,16 @@ class Proxy6:
 
         :raises Proxy6Error:
         """
-        params = _clean_params(count=count, period=period, version=version)
+        params = _getprice_params(count, period, version)
         data = self._request('getprice', params=params)
 
-        return schemas.PriceInformationSchema().load(data)
+        return schemas.load_price_information(data)
 
+    @_cached(ttl=30)
     def get_count(self, *, country: str, version: Optional[ProxyVersion] = None) -> int:
         """
         Get information about the amount of proxies available to purchase for
-        a selected country
+        a selected country. Results are cached for 30 seconds.
 
         :param count: Country code in ISO2 format
         :param version: Proxy version (default is IPv6)
@@ -102,17 +376,16 @@ class Proxy6:
 
         :raises Proxy6Error:
         """
-        params = _clean_params(country=country, version=version)
+        params = _getcount_params(country, version)
         data = self._request('getcount', params=params)
 
-        self.__class__._pop_common_fields(data)
-        assert len(data) == 1
-
         return data['count']
 
+    @_cached(ttl=60, copy=list)
     def get_countries(self, *, version: Optional[ProxyVersion] = None) -> List[str]:
         """
-        Get information on available for proxies purchase countries
+        Get information on available for proxies purchase countries. Results are
+        cached for 1 minute.
 
         :param version: Proxy version (default is IPv6)
 
@@ -120,12 +393,9 @@ class Proxy6:
 
         :raises Proxy6Error:
         """
-        params = _clean_params(version=version)
+        params = _getcountry_params(version)
         data = self._request('getcountry', params=params)
 
-        self.__class__._pop_common_fields(data)
-        assert len(data) == 1
-
         return data['list']
 
     def get_proxies(
@@ -141,12 +411,11 @@ class Proxy6:
 
         :raises Proxy6Error:
         """
-        params = _clean_params(state=state, descr=description, nokey=True)
-        data = self._request('getproxy', params=params)
+        params = _getproxy_params(state, description)
+        # stream proxies, only keeping their loaded version in memory
+        data = self._request('getproxy', params=params, stream=True)
 
-        self.__class__._pop_common_fields(data)
-
-        proxies = schemas.ProxySchema().load(data['list'], many=True)
+        proxies = [schemas.load_proxy(proxy) for proxy in data['list']]
 
         assert len(proxies) == data['list_count']
         if description is not None:
@@ -163,9 +432,7 @@ class Proxy6:
 
         :raises Proxy6Error:
         """
-        params = _clean_params(
-            ids=_format_list_param(proxy.id for proxy in proxies), type=type
-        )
+        params = _settype_params(_format_ids(proxies), type)
         self._request('settype', params=params)
 
     def set_description(
@@ -188,8 +455,8 @@ class Proxy6:
         """
         assert old is None or len(old) <= 50
 
-        params = _clean_params(
-            new=new, old=old, ids=_format_list_param(proxy.id for proxy in proxies)
+        params = _setdescr_params(
+            new, old, None if proxies is None else _format_ids(proxies)
         )
         return self._request('setdescr', params=params).pop('count')
 
@@ -221,18 +488,17 @@ class Proxy6:
         """
         assert len(description) <= 50
 
-        params = _clean_params(
-            count=count,
-            period=period,
-            country=country,
-            version=version,
-            type=type,
-            descr=description or None,
-            auto_prolong=auto_renew or None,
-            nokey=True,
+        params = _buy_params(
+            count,
+            period,
+            country,
+            version,
+            type,
+            description or None,
+            auto_renew or None,
         )
-        return schemas.PurchaseSchema().load(
-            {'description': description or "", **self._request('buy', params=params)}
+        return schemas.load_purchase(
+            self._request('buy', params=params), description=description
         )
 
     def prolong(self, *, period: int, proxies: Iterable[Proxy]) -> Prolongation:
@@ -246,13 +512,11 @@ class Proxy6:
 
         :raises Proxy6Error:
         """
-        proxies = copy.deepcopy(proxies)
+        proxies = tuple(proxies)
 
-        params = _clean_params(
-            period=period, ids=_format_list_param(proxy.id for proxy in proxies)
-        )
-        return schemas.ProlongationSchema(proxies).load(
-            self._request('prolong', params=params)
+        params = _prolong_params(period, _format_ids(proxies))
+        return schemas.load_prolongation(
+            self._request('prolong', params=params), proxies
         )
 
     def delete(self, *, proxies: Iterable[Proxy]) -> int:
@@ -265,7 +529,7 @@ class Proxy6:
 
         :raises Proxy6Error:
         """
-        params = _clean_params(ids=_format_list_param(proxy.id for proxy in proxies))
+        params = _delete_params(_format_ids(proxies))
         return self._request('delete', params=params)['count']
 
     def delete_by_description(self, *, description: str) -> int:
@@ -278,7 +542,7 @@ class Proxy6:
 
         :raises Proxy6Error:
         """
-        params = _clean_params(descr=description)
+        params = _clean_params({'descr': description})
         return self._request('delete', params=params)['count']
 
     def is_proxy_valid(self, *, proxy_id: int) -> bool:
@@ -291,12 +555,8 @@ class Proxy6:
 
         :raises Proxy6Error:
         """
-        params = _clean_params(ids=proxy_id)
+        params = _check_params(proxy_id)
         data = self._request('check', params=params)
-
-        self.__class__._pop_common_fields(data)
-
-        assert data.pop('proxy_id') == proxy_id
-        assert len(data) == 1
+        assert data['proxy_id'] == proxy_id
 
         return data['proxy_status']
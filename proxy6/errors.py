@@ -27,13 +27,15 @@ class NoMoneyError(Proxy6Error):
     description = "Error no money"
 
 
+_ERRORS_BY_CODE = {Error.code: Error for Error in (CountError, NoMoneyError)}
+
+
 def select(data: dict) -> Proxy6Error:
     code = data.pop('error_id')
     description = data.pop('error')
 
-    for Error in (CountError, NoMoneyError):
-        if code == Error.code:
-            assert description == Error.description
-            return Error
+    Error = _ERRORS_BY_CODE.get(code)
+    if Error is not None:
+        return Error()
 
     return Proxy6Error(code=code, description=description)
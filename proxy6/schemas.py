@@ -1,19 +1,42 @@
+import dataclasses
+import datetime
 import enum
+import functools
 import ipaddress
+import sys
 
-from typing import Sequence
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
 
 from marshmallow import EXCLUDE, fields, post_load, pre_load, Schema
 
 from . import types
 
+# addresses are immutable, and shared IPv4 ones appear for several proxies
+_load_ip_address = functools.lru_cache(maxsize=4096)(ipaddress.ip_address)
+
 
 class IPAddressField(fields.Field):
     def _serialize(self, value, attr, obj, **kwargs):
         return str(value)
 
     def _deserialize(self, value, attr, data, **kwargs):
-        return ipaddress.ip_address(value)
+        return _load_ip_address(value)
+
+
+# Proxy6 dates such as '2016-06-19 16:32:39' are ISO 8601 with a space separator,
+# which fromisoformat accepts. The unixtime fields are not used since converting
+# them would depend on the local timezone.
+_load_datetime = datetime.datetime.fromisoformat
+
+
+class ISODateTimeField(fields.Field):
+    """Faster than `fields.DateTime`, Proxy6 always sends ISO 8601 dates"""
+
+    def _serialize(self, value, attr, obj, **kwargs):
+        return value.isoformat()
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        return _load_datetime(value)
 
 
 class EnumField(fields.Field):
@@ -63,8 +86,8 @@ class ProxySchema(Schema):
     type = EnumField(types.ProxyType, required=True)
     country = fields.String(required=True)
 
-    purchased_at = fields.DateTime(required=True, data_key='date')
-    expires_at = fields.DateTime(required=True, data_key='date_end')
+    purchased_at = ISODateTimeField(required=True, data_key='date')
+    expires_at = ISODateTimeField(required=True, data_key='date_end')
 
     description = fields.String(required=True, data_key='descr')
 
@@ -96,7 +119,7 @@ class PurchaseSchema(PriceInformationSchema):
 
     @post_load
     def make_obj(self, data, **kwargs):
-        return types.Purchase(**data)
+        return types.Purchase(**{**data, 'proxies': tuple(data['proxies'])})
 
 
 class ProlongationSchema(PriceInformationSchema):
@@ -115,8 +138,23 @@ class ProlongationSchema(PriceInformationSchema):
             proxy for proxy in self.existing_proxies if str(proxy.id) in temp
         )
 
+        # build loadable data directly rather than dumping proxies through a schema
         data['list'] = [
-            {**ProxySchema().dump(proxy), 'date_end': temp[str(proxy.id)]['date_end']}
+            {
+                'id': proxy.id,
+                'ip': str(proxy.ip),
+                'host': proxy.host,
+                'port': proxy.port,
+                'user': proxy.user,
+                'pass': proxy.password,
+                'version': proxy.version.value,
+                'type': proxy.type.value,
+                'country': proxy.country,
+                'date': proxy.purchased_at.isoformat(),
+                'date_end': temp[str(proxy.id)]['date_end'],
+                'descr': proxy.description,
+                'active': proxy.active,
+            }
             for proxy in used_proxies
         ]
 
@@ -124,4 +162,127 @@ class ProlongationSchema(PriceInformationSchema):
 
     @post_load
     def make_obj(self, data, **kwargs):
-        return types.Prolongation(**data)
+        return types.Prolongation(**{**data, 'proxies': tuple(data['proxies'])})
+
+
+# Schemas are stateless once built, share instances rather than paying for
+# their construction on every API call
+PRICE_INFORMATION_SCHEMA = PriceInformationSchema()
+PROXY_SCHEMA = ProxySchema()
+PURCHASE_SCHEMA = PurchaseSchema()
+
+
+def _make_loader(
+    cls: type, field_map: Dict[str, Tuple[str, Optional[Callable]]]
+) -> Callable[[dict], Any]:
+    """
+    Generate a function building `cls` instances out of API data, avoiding the
+    overhead of marshmallow's generic fields machinery
+
+    :param cls: type of the built objects
+    :param field_map: data key and converter of each `cls` field, values are
+        passed as is when the converter is `None`
+    """
+    namespace = {'cls': cls}
+    arguments = []
+
+    for name, (key, converter) in field_map.items():
+        if converter is None:
+            arguments.append(f'{name}=data[{key!r}]')
+        else:
+            namespace[f'_load_{name}'] = converter
+            arguments.append(f'{name}=_load_{name}(data[{key!r}])')
+
+    source = f"def load(data):\n    return cls({', '.join(arguments)})\n"
+    exec(compile(source, f'<{cls.__name__} loader>', 'exec'), namespace)
+
+    return namespace['load']
+
+
+def _load_boolean(value) -> bool:
+    if value in fields.Boolean.truthy:
+        return True
+    if value in fields.Boolean.falsy:
+        return False
+    raise ValueError(f"Not a valid boolean: {value!r}")
+
+
+# look members up directly rather than through the costlier Enum.__call__
+_load_type = types.ProxyType._value2member_map_.__getitem__
+_proxy_versions = types.ProxyVersion._value2member_map_
+
+
+def _load_version(value) -> types.ProxyVersion:
+    return _proxy_versions[int(value)]
+
+
+_PRICE_INFORMATION_FIELDS = {
+    'price': ('price', float),
+    'price_single': ('price_single', float),
+    'period': ('period', int),
+    'count': ('count', int),
+    'currency': ('currency', None),
+}
+
+load_price_information = _make_loader(types.PriceInformation, _PRICE_INFORMATION_FIELDS)
+
+load_proxy = _make_loader(
+    types.Proxy,
+    {
+        'id': ('id', int),
+        'ip': ('ip', _load_ip_address),
+        'host': ('host', None),
+        'port': ('port', int),
+        'user': ('user', None),
+        'password': ('pass', None),
+        'version': ('version', _load_version),
+        'type': ('type', _load_type),
+        # shared by many proxies, intern to keep a single copy of each value
+        'country': ('country', sys.intern),
+        'purchased_at': ('date', _load_datetime),
+        'expires_at': ('date_end', _load_datetime),
+        'description': ('descr', sys.intern),
+        'active': ('active', _load_boolean),
+    },
+)
+
+
+def _load_proxies(data: list) -> tuple:
+    return tuple([load_proxy(proxy) for proxy in data])
+
+
+_load_purchase = _make_loader(
+    types.Purchase, {**_PRICE_INFORMATION_FIELDS, 'proxies': ('list', _load_proxies)}
+)
+
+_load_prolongation = _make_loader(
+    types.Prolongation, {**_PRICE_INFORMATION_FIELDS, 'proxies': ('list', None)}
+)
+
+
+def load_purchase(data: dict, *, description: str) -> types.Purchase:
+    """Same as `PurchaseSchema`, proxies are given the order country and description"""
+    country = data['country']
+    for proxy in data['list']:
+        proxy.update({'country': country, 'descr': description})
+
+    return _load_purchase(data)
+
+
+def load_prolongation(
+    data: dict, existing_proxies: Sequence[types.Proxy]
+) -> types.Prolongation:
+    """Same as `ProlongationSchema`, prolonged proxies are updated copies"""
+    prolonged = data['list']
+    assert len(prolonged) <= len(existing_proxies)
+
+    proxies = tuple(
+        dataclasses.replace(
+            proxy,
+            expires_at=_load_datetime(prolonged[str(proxy.id)]['date_end']),
+        )
+        for proxy in existing_proxies
+        if str(proxy.id) in prolonged
+    )
+
+    return _load_prolongation({**data, 'list': proxies})
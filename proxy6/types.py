@@ -2,21 +2,30 @@ from __future__ import annotations
 
 import datetime
 import enum
+import functools
 import ipaddress
+import sys
 
 from dataclasses import dataclass, field
 from decimal import Decimal
-from typing import Sequence, Union
+from typing import Tuple, Union
 
+# instances get built for every proxy of API responses, avoid giving each of them
+# a __dict__ when slots are supported
+if sys.version_info >= (3, 10):
+    _dataclass = functools.partial(dataclass, slots=True, frozen=True)
+else:
+    _dataclass = functools.partial(dataclass, frozen=True)
 
-@dataclass
+
+@_dataclass
 class Account:
     user_id: int
     balance: Decimal
     currency: str
 
 
-@dataclass
+@_dataclass
 class PriceInformation:
     price: float
     price_single: float
@@ -25,22 +34,30 @@ class PriceInformation:
     currency: str
 
 
-@dataclass
+@_dataclass
 class Purchase(PriceInformation):
-    proxies: Sequence[Proxy]
+    proxies: Tuple[Proxy, ...]
 
 
 Prolongation = Purchase
 
 
-class ProxyState(enum.Enum):
+class _StrEnum(str, enum.Enum):
+    """Enum whose members are their values, so they can be sent as is to the API"""
+
+    def __str__(self) -> str:
+        # a method rather than an alias, EnumMeta of Python 3.7 replaces the latter
+        return str.__str__(self)
+
+
+class ProxyState(_StrEnum):
     ALL = 'all'
     ACTIVE = 'active'
     NOT_ACTIVE = 'expiring'
     EXPIRED = 'expired'
 
 
-class ProxyType(enum.Enum):
+class ProxyType(_StrEnum):
     HTTP = 'http'
     SOCKS5 = 'socks'
 
@@ -51,7 +68,7 @@ class ProxyVersion(enum.IntEnum):
     IPv6 = 6
 
 
-@dataclass
+@_dataclass
 class Proxy:
     id: int
 
@@ -1,3 +1,5 @@
+from unittest import mock
+
 import pytest
 
 
@@ -13,3 +15,12 @@ def client(api_key):
     from proxy6.api import Proxy6
 
     return Proxy6(api_key)
+
+
+@pytest.fixture
+def mock_request(monkeypatch):
+    """Mock replacing `Proxy6._request`, to set API responses on"""
+    request = mock.MagicMock()
+    monkeypatch.setattr('proxy6.api.Proxy6._request', request)
+
+    return request
@@ -1,28 +1,29 @@
+import dataclasses
+import datetime
 import ipaddress
-
-import factory
+import itertools
 
 from proxy6.types import Proxy, ProxyType, ProxyVersion
 
-
-class ProxyFactory(factory.Factory):
-    class Meta:
-        model = Proxy
-
-    id = factory.Sequence(lambda i: i)
-
-    ip = factory.Sequence(ipaddress.ip_address)
-    host = factory.Sequence(lambda i: str(ipaddress.ip_address(i)))
-    port = factory.Faker('pyint')
-
-    user = factory.Sequence(lambda i: f'user{i}')
-    password = 'password'
-
-    version = ProxyVersion.IPv6
-    type = ProxyType.HTTP
-    country = 'ru'
-
-    purchased_at = factory.Faker('past_datetime', start_date='-30d')
-    expires_at = factory.Faker('future_datetime', end_date='+30d')
-
-    active = True
+_ids = itertools.count()
+
+_TEMPLATE = Proxy(
+    id=0,
+    ip=ipaddress.ip_address('2a00:1838:32:19f:45fb:2640::330'),
+    host='185.22.134.250',
+    port=7330,
+    user='user',
+    password='password',
+    version=ProxyVersion.IPv6,
+    type=ProxyType.HTTP,
+    country='ru',
+    purchased_at=datetime.datetime(2016, 6, 19, 16, 32, 39),
+    expires_at=datetime.datetime(2016, 7, 12, 11, 50, 41),
+    active=True,
+)
+
+
+def ProxyFactory(**kwargs) -> Proxy:
+    """Build a proxy, fields that are not given are taken from a fixed template"""
+    kwargs.setdefault('id', next(_ids))
+    return dataclasses.replace(_TEMPLATE, **kwargs)
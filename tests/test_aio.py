@@ -0,0 +1,432 @@
+import asyncio
+import datetime
+import ipaddress
+
+from decimal import Decimal
+from unittest import mock
+
+import orjson
+import pytest
+
+from proxy6.aio import AsyncProxy6
+from proxy6.errors import Proxy6Error
+from proxy6.types import (
+    Account,
+    PriceInformation,
+    Proxy,
+    ProxyState,
+    ProxyType,
+    ProxyVersion,
+    Purchase,
+)
+
+from .factories import ProxyFactory
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def returning(value):
+    """Side effect making a mocked coroutine method return the given value"""
+
+    async def side_effect(*args, **kwargs):
+        return value
+
+    return side_effect
+
+
+class MockResponse:
+    def __init__(self, data: dict):
+        self.status = 200
+        self._data = data
+
+    async def read(self):
+        return orjson.dumps(self._data)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+@pytest.fixture
+def async_client():
+    return AsyncProxy6(api_key='key')
+
+
+def test_session_lifetime(async_client):
+    async def main():
+        async with async_client as client:
+            assert client is async_client
+            assert not client._session.closed
+            session = client._session
+
+        assert session.closed
+        assert async_client._session is None
+
+    run(main())
+
+
+def test_requests(async_client):
+    """
+    Requests should be formed according to the following layout
+
+        /api/{api_key}/{method}?{params}
+
+    relatively to the session base URL, and return JSON data stripped from the
+    `'status'` field
+    """
+    session = mock.Mock()
+    session.get.return_value = MockResponse({'status': 'yes', 'result': 3})
+    async_client._session = session
+
+    data = run(async_client._request('foo', params={'a': 1, 'b': True}))
+    assert data == {'result': 3}
+    session.get.assert_called_once_with('/api/key/foo?a=1&b=True')
+    session.get.reset_mock()
+
+    data = run(async_client._request('foo'))
+    assert data == {'result': 3}
+    session.get.assert_called_once_with('/api/key/foo')
+
+
+@mock.patch('proxy6.errors.select')
+def test_requests_failed(select, async_client):
+    session = mock.Mock()
+    session.get.return_value = MockResponse(
+        {'status': 'no', 'error_id': 123, 'error': "Lorem ipsum"}
+    )
+    async_client._session = session
+
+    select.return_value = Proxy6Error(code=123, description="Lorem ipsum")
+
+    with pytest.raises(Proxy6Error):
+        run(async_client._request('foo'))
+
+    select.assert_called_once_with({'error_id': 123, 'error': "Lorem ipsum"})
+
+
+def test_get_account_from_last_response(async_client):
+    """Account information of responses less than 5 seconds old should be reused"""
+    session = mock.Mock()
+    session.get.side_effect = [
+        MockResponse(
+            {
+                'status': 'yes',
+                'user_id': '1',
+                'balance': '48.80',
+                'currency': 'RUB',
+                'count': 971,
+            }
+        ),
+        MockResponse(
+            {
+                'status': 'yes',
+                'user_id': '1',
+                'balance': '42.80',
+                'currency': 'RUB',
+                'price': 4.2,
+                'price_single': 0.6,
+                'period': 7,
+                'count': 1,
+            }
+        ),
+    ]
+    async_client._session = session
+
+    with mock.patch('proxy6.aio.time.monotonic', return_value=1000):
+        run(async_client.get_count(country='ru'))
+
+    with mock.patch('proxy6.aio.time.monotonic', return_value=1004):
+        assert run(async_client.get_account()) == Account(
+            user_id=1, balance=Decimal('48.80'), currency='RUB'
+        )
+
+    assert session.get.call_count == 1
+
+    with mock.patch('proxy6.aio.time.monotonic', return_value=1005):
+        assert run(async_client.get_account()) == Account(
+            user_id=1, balance=Decimal('42.80'), currency='RUB'
+        )
+
+    assert session.get.call_count == 2
+    assert session.get.call_args == mock.call('/api/key/getprice?count=1&period=7')
+
+
+@mock.patch('proxy6.aio.AsyncProxy6._request')
+def test_get_price(request, async_client):
+    request.side_effect = returning(
+        {
+            'user_id': '1',
+            'balance': '48.80',
+            'currency': 'RUB',
+            'price': 600,
+            'price_single': 0.2,
+            'period': 15,
+            'count': 200,
+        }
+    )
+
+    assert run(
+        async_client.get_price(count=200, period=15, version=ProxyVersion.IPv4)
+    ) == PriceInformation(
+        price=600, price_single=0.2, period=15, count=200, currency='RUB'
+    )
+
+    request.assert_called_once_with(
+        'getprice',
+        params={'count': 200, 'period': 15, 'version': ProxyVersion.IPv4.value},
+    )
+
+
+@mock.patch('proxy6.aio.AsyncProxy6._request')
+def test_gather_prices(request, async_client):
+    async def side_effect(method, *, params):
+        return {
+            'user_id': '1',
+            'balance': '48.80',
+            'currency': 'RUB',
+            'price': params['count'] * 3,
+            'price_single': 3,
+            'period': params['period'],
+            'count': params['count'],
+        }
+
+    request.side_effect = side_effect
+
+    prices = run(
+        async_client.gather_prices(
+            [{'count': 1, 'period': 7}, {'count': 2, 'period': 30}]
+        )
+    )
+
+    assert prices == [
+        PriceInformation(price=3, price_single=3, period=7, count=1, currency='RUB'),
+        PriceInformation(price=6, price_single=3, period=30, count=2, currency='RUB'),
+    ]
+    assert request.call_count == 2
+
+
+@mock.patch('proxy6.aio.AsyncProxy6._request')
+def test_get_countries(request, async_client):
+    request.side_effect = returning(
+        {'user_id': '1', 'balance': '48.80', 'currency': 'RUB', 'list': ['ru', 'ua']}
+    )
+
+    assert run(async_client.get_countries(version=ProxyVersion.IPv4)) == ['ru', 'ua']
+
+    request.assert_called_once_with(
+        'getcountry', params={'version': ProxyVersion.IPv4.value}
+    )
+
+
+@mock.patch('proxy6.aio.AsyncProxy6._request')
+def test_get_proxies(request, async_client):
+    request.side_effect = returning(
+        {
+            'user_id': '1',
+            'balance': '48.80',
+            'currency': 'RUB',
+            'list_count': 1,
+            'list': [
+                {
+                    'id': '14',
+                    'ip': '123.234.213.0',
+                    'host': '185.22.134.242',
+                    'port': '7386',
+                    'user': 'nV5TFK',
+                    'pass': '3Itr1t',
+                    'version': '3',
+                    'type': 'socks',
+                    'country': 'ru',
+                    'date': '2016-06-27 16:06:22',
+                    'date_end': '2016-07-11 16:06:22',
+                    'unixtime': 1466379151,
+                    'unixtime_end': 1468349441,
+                    'descr': "foo",
+                    'active': '1',
+                }
+            ],
+        }
+    )
+
+    assert run(
+        async_client.get_proxies(state=ProxyState.ACTIVE, description="foo")
+    ) == [
+        Proxy(
+            id=14,
+            ip=ipaddress.ip_address('123.234.213.0'),
+            host='185.22.134.242',
+            port=7386,
+            user='nV5TFK',
+            password='3Itr1t',
+            version=ProxyVersion.IPv4_SHARED,
+            type=ProxyType.SOCKS5,
+            country='ru',
+            purchased_at=datetime.datetime(2016, 6, 27, 16, 6, 22),
+            expires_at=datetime.datetime(2016, 7, 11, 16, 6, 22),
+            description="foo",
+            active=True,
+        )
+    ]
+
+    request.assert_called_once_with(
+        'getproxy',
+        params={'state': ProxyState.ACTIVE.value, 'descr': "foo", 'nokey': True},
+    )
+
+
+@mock.patch('proxy6.aio.AsyncProxy6._request')
+def test_set_type(request, async_client):
+    request.side_effect = returning(
+        {'user_id': '1', 'balance': '48.80', 'currency': 'RUB'}
+    )
+
+    proxies = (ProxyFactory(id=10), ProxyFactory(id=11))
+    run(async_client.set_type(proxies=proxies, type=ProxyType.SOCKS5))
+
+    request.assert_called_once_with(
+        'settype', params={'ids': '10,11', 'type': ProxyType.SOCKS5.value}
+    )
+
+
+@mock.patch('proxy6.aio.AsyncProxy6._request')
+def test_buy(request, async_client):
+    request.side_effect = returning(
+        {
+            'user_id': '1',
+            'balance': 42.5,
+            'currency': 'RUB',
+            'count': 1,
+            'price': 6.3,
+            'price_single': 0.9,
+            'period': 7,
+            'country': 'ru',
+            'list': [
+                {
+                    'id': '15',
+                    'ip': '2a00:1838:32:19f:45fb:2640::330',
+                    'host': '185.22.134.250',
+                    'port': '7330',
+                    'user': '5svBNZ',
+                    'pass': 'iagn2d',
+                    'type': 'http',
+                    'version': '6',
+                    'date': '2016-06-19 16:32:39',
+                    'date_end': '2016-07-12 11:50:41',
+                    'unixtime': 1466379159,
+                    'unixtime_end': 1468349441,
+                    'active': '1',
+                }
+            ],
+        }
+    )
+
+    assert run(
+        async_client.buy(count=1, period=7, country='ru', description="foo")
+    ) == Purchase(
+        price=6.3,
+        price_single=0.9,
+        period=7,
+        count=1,
+        currency='RUB',
+        proxies=(
+            Proxy(
+                id=15,
+                ip=ipaddress.ip_address('2a00:1838:32:19f:45fb:2640::330'),
+                host='185.22.134.250',
+                port=7330,
+                country='ru',
+                user='5svBNZ',
+                password='iagn2d',
+                version=ProxyVersion.IPv6,
+                type=ProxyType.HTTP,
+                purchased_at=datetime.datetime(2016, 6, 19, 16, 32, 39),
+                expires_at=datetime.datetime(2016, 7, 12, 11, 50, 41),
+                active=True,
+                description="foo",
+            ),
+        ),
+    )
+
+    request.assert_called_once_with(
+        'buy',
+        params={
+            'count': 1,
+            'period': 7,
+            'country': 'ru',
+            'descr': "foo",
+            'nokey': True,
+        },
+    )
+
+
+@mock.patch('proxy6.aio.AsyncProxy6._request')
+def test_prolong(request, async_client):
+    request.side_effect = returning(
+        {
+            'user_id': '1',
+            'balance': 29,
+            'currency': 'RUB',
+            'price': 12.6,
+            'price_single': 0.9,
+            'period': 7,
+            'count': 2,
+            'list': {
+                '15': {'id': 15, 'date_end': '2016-07-15 06:30:27'},
+                '16': {'id': 16, 'date_end': '2016-07-16 09:31:21'},
+            },
+        }
+    )
+
+    proxies = (ProxyFactory(id=15), ProxyFactory(id=16))
+    prolongation = run(async_client.prolong(proxies=proxies, period=7))
+
+    assert prolongation.price == 12.6
+    assert prolongation.count == 2
+
+    a, b = prolongation.proxies
+    assert a.id == 15 and a.expires_at == datetime.datetime(2016, 7, 15, 6, 30, 27)
+    assert b.id == 16 and b.expires_at == datetime.datetime(2016, 7, 16, 9, 31, 21)
+
+    request.assert_called_once_with('prolong', params={'period': 7, 'ids': '15,16'})
+
+
+@mock.patch('proxy6.aio.AsyncProxy6._request')
+def test_delete(request, async_client):
+    request.side_effect = returning(
+        {'user_id': '1', 'balance': '48.80', 'currency': 'RUB', 'count': 2}
+    )
+
+    proxies = (ProxyFactory(id=15), ProxyFactory(id=16))
+    assert run(async_client.delete(proxies=proxies)) == 2
+
+    request.assert_called_once_with('delete', params={'ids': '15,16'})
+
+
+@mock.patch('proxy6.aio.AsyncProxy6._request')
+def test_are_proxies_valid(request, async_client):
+    async def side_effect(method, *, params):
+        return {
+            'user_id': '1',
+            'balance': '48.80',
+            'currency': 'RUB',
+            'proxy_id': params['ids'],
+            'proxy_status': params['ids'] != 16,
+        }
+
+    request.side_effect = side_effect
+
+    assert run(async_client.are_proxies_valid(proxy_ids=[15, 16, 17])) == {
+        15: True,
+        16: False,
+        17: True,
+    }
+
+    assert request.call_args_list == [
+        mock.call('check', params={'ids': 15}),
+        mock.call('check', params={'ids': 16}),
+        mock.call('check', params={'ids': 17}),
+    ]
@@ -5,11 +5,13 @@ from decimal import Decimal
 from unittest import mock
 
 import pytest
+import requests
 import responses
 
 from proxy6.api import (
     Account,
     _clean_params,
+    _make_params_builder,
     PriceInformation,
     Proxy6,
     ProxyState,
@@ -59,6 +61,118 @@ def test_requests():
     assert request.url == 'https://proxy6.net/api/1e339044/foo'
 
 
+def test_close():
+    client = Proxy6(api_key='key')
+
+    with mock.patch.object(client._session, 'close') as close:
+        with client as c:
+            assert c is client
+            close.assert_not_called()
+
+        close.assert_called_once_with()
+
+
+def test_endpoints():
+    """API methods URLs should be computed once per client"""
+    client = Proxy6(api_key='1e339044')
+
+    assert client._endpoints['getprice'] == 'https://proxy6.net/api/1e339044/getprice'
+    assert client._endpoints['check'] == 'https://proxy6.net/api/1e339044/check'
+
+
+def test_session_retries():
+    client = Proxy6(api_key='key')
+
+    retries = client._session.get_adapter('https://proxy6.net/').max_retries
+    assert retries.total == 3
+    assert retries.read == 0
+    assert retries.is_retry('GET', 503)
+    assert not retries.is_retry('GET', 504)
+
+    for method in ('buy', 'prolong'):
+        adapter = client._session.get_adapter(f'https://proxy6.net/api/key/{method}')
+        assert adapter.max_retries.total == 3
+        assert adapter.max_retries.read == 0
+        assert not adapter.max_retries.is_retry('GET', 502)
+        assert not adapter.max_retries.is_retry('GET', 503)
+
+
+@responses.activate
+def test_requests_streamed():
+    """
+    Streamed requests should return the `'list'` field as an iterator over its
+    items, fields following it being read once it is exhausted
+    """
+    client = Proxy6(api_key='key')
+
+    responses.add(
+        responses.GET,
+        'https://proxy6.net/api/key/foo',
+        body=(
+            '{"status": "yes", "user_id": "1", "balance": "48.80", "currency": "RUB",'
+            ' "list_count": 2,'
+            ' "list": [{"id": "1", "port": 7330}, {"id": "2", "tags": ["a"]}],'
+            ' "after": 0}'
+        ),
+    )
+
+    data = client._request('foo', stream=True)
+
+    items = data.pop('list')
+    assert data == {
+        'user_id': '1',
+        'balance': '48.80',
+        'currency': 'RUB',
+        'list_count': 2,
+    }
+    assert list(items) == [{'id': '1', 'port': 7330}, {'id': '2', 'tags': ['a']}]
+    assert data['after'] == 0
+
+    responses.add(
+        responses.GET,
+        'https://proxy6.net/api/key/bar',
+        body='{"status": "no", "error_id": 123, "error": "Lorem ipsum"}',
+    )
+
+    with pytest.raises(Proxy6Error):
+        client._request('bar', stream=True)
+
+
+@responses.activate
+def test_requests_streamed_trailing_fields():
+    """Fields following the `'list'` field should not depend on keys order"""
+    client = Proxy6(api_key='key')
+
+    responses.add(
+        responses.GET,
+        'https://proxy6.net/api/key/foo',
+        body=(
+            '{"list": [{"id": "1"}, 3], "list_count": 2, "status": "yes",'
+            ' "user_id": "1", "balance": "48.80", "currency": "RUB"}'
+        ),
+    )
+
+    data = client._request('foo', stream=True)
+    assert list(data.pop('list')) == [{'id': '1'}, 3]
+    assert data == {
+        'list_count': 2,
+        'user_id': '1',
+        'balance': '48.80',
+        'currency': 'RUB',
+    }
+    assert client._account_fields == ('1', '48.80', 'RUB')
+
+    responses.add(
+        responses.GET,
+        'https://proxy6.net/api/key/bar',
+        body='{"list": [], "status": "no", "error_id": 30, "error": "Error unknown"}',
+    )
+
+    data = client._request('bar', stream=True)
+    with pytest.raises(Proxy6Error):
+        list(data['list'])
+
+
 @responses.activate
 @mock.patch('proxy6.errors.select')
 def test_requests_failed(select):
@@ -90,38 +204,138 @@ def test_requests_failed(select):
     assert str(e) == "Mock error"
 
 
+@responses.activate
+def test_requests_enum_params():
+    """String enums members should be sent as their value"""
+    client = Proxy6(api_key='key')
+
+    responses.add(
+        responses.GET,
+        'https://proxy6.net/api/key/settype',
+        json={'status': 'yes', 'user_id': '1', 'balance': '48.80', 'currency': 'RUB'},
+    )
+
+    client.set_type(proxies=[ProxyFactory(id=10)], type=ProxyType.SOCKS5)
+
+    request = responses.calls[0].request
+    assert request.url == 'https://proxy6.net/api/key/settype?ids=10&type=socks'
+
+
+@responses.activate
+def test_requests_text_params():
+    """Free text parameters should be encoded the same way requests does"""
+    client = Proxy6(api_key='key')
+
+    responses.add(
+        responses.GET,
+        'https://proxy6.net/api/key/foo',
+        json={'status': 'yes'},
+    )
+
+    params = {'descr': "прокси 1", 'ids': '10,11'}
+    client._request('foo', params=params)
+
+    expected = requests.Request('GET', 'https://proxy6.net/api/key/foo', params=params)
+    assert responses.calls[0].request.url == expected.prepare().url
+
+
 def test_clean_params():
-    assert _clean_params() == {}
-    assert _clean_params(foo=None) == {}
-    assert _clean_params(foo=0) == {'foo': 0}
-    assert _clean_params(foo=0, bar="", baz=None) == {'foo': 0, 'bar': ""}
+    assert _clean_params({}) == {}
+    assert _clean_params({'foo': None}) == {}
+    assert _clean_params({'foo': 0}) == {'foo': 0}
+    assert _clean_params({'foo': 0, 'bar': "", 'baz': None}) == {'foo': 0, 'bar': ""}
+
+    params = _clean_params({'foo': ProxyType.HTTP, 'bar': ProxyState.ACTIVE})
+    assert params == {'foo': 'http', 'bar': 'active'}
+    assert params['foo'] is ProxyType.HTTP
+
 
-    import enum
+def test_make_params_builder():
+    """Generated builders should behave like _clean_params"""
+    build = _make_params_builder(
+        'foo', 'bar', 'baz', optional={'bar', 'baz'}, enums={'baz'}
+    )
 
-    class E(enum.Enum):
-        A = 'a'
-        B = 'b'
+    assert build(0, None, None) == _clean_params({'foo': 0}) == {'foo': 0}
+    assert build(0, "", ProxyVersion.IPv4) == _clean_params(
+        {'foo': 0, 'bar': "", 'baz': ProxyVersion.IPv4}
+    )
+    assert build(0, "", ProxyVersion.IPv4) == {'foo': 0, 'bar': "", 'baz': 4}
 
-    assert _clean_params(foo=E.A, bar=E.B) == {'foo': 'a', 'bar': 'b'}
+    build = _make_params_builder('foo', constants={'nokey': True})
+    assert build('a') == {'foo': 'a', 'nokey': True}
 
 
-@mock.patch('proxy6.api.Proxy6._request')
-def test_get_account(request, client):
-    request.return_value = {
+def test_get_account(mock_request, client):
+    mock_request.return_value = {
         'user_id': '1',
         'balance': '48.80',
         'currency': 'RUB',
-        'list': ['ru', 'ua', 'us'],
+        'price': 4.2,
+        'price_single': 0.6,
+        'period': 7,
+        'count': 1,
     }
 
     assert client.get_account() == Account(
         user_id=1, balance=Decimal('48.80'), currency='RUB'
     )
 
+    mock_request.assert_called_once_with('getprice', params={'count': 1, 'period': 7})
+
+
+@responses.activate
+def test_get_account_from_last_response():
+    """Account information of responses less than 5 seconds old should be reused"""
+    client = Proxy6(api_key='key')
+
+    responses.add(
+        responses.GET,
+        'https://proxy6.net/api/key/getcount',
+        json={
+            'status': 'yes',
+            'user_id': '1',
+            'balance': '48.80',
+            'currency': 'RUB',
+            'count': 971,
+        },
+    )
+
+    with mock.patch('proxy6.api.time.monotonic', return_value=1000):
+        client.get_count(country='ru')
+
+    with mock.patch('proxy6.api.time.monotonic', return_value=1004):
+        assert client.get_account() == Account(
+            user_id=1, balance=Decimal('48.80'), currency='RUB'
+        )
+
+    assert len(responses.calls) == 1
+
+    responses.add(
+        responses.GET,
+        'https://proxy6.net/api/key/getprice',
+        json={
+            'status': 'yes',
+            'user_id': '1',
+            'balance': '42.80',
+            'currency': 'RUB',
+            'price': 4.2,
+            'price_single': 0.6,
+            'period': 7,
+            'count': 1,
+        },
+    )
+
+    with mock.patch('proxy6.api.time.monotonic', return_value=1005):
+        assert client.get_account() == Account(
+            user_id=1, balance=Decimal('42.80'), currency='RUB'
+        )
+
+    assert len(responses.calls) == 2
+
 
-@mock.patch('proxy6.api.Proxy6._request')
-def test_get_price(request, client):
-    request.return_value = {
+def test_get_price(mock_request, client):
+    mock_request.return_value = {
         'user_id': '1',
         'balance': '48.80',
         'currency': 'RUB',
@@ -135,10 +349,12 @@ def test_get_price(request, client):
         price=1800, price_single=0.6, period=30, count=100, currency='RUB'
     )
 
-    request.assert_called_once_with('getprice', params={'count': 100, 'period': 30})
-    request.reset_mock()
+    mock_request.assert_called_once_with(
+        'getprice', params={'count': 100, 'period': 30}
+    )
+    mock_request.reset_mock()
 
-    request.return_value = {
+    mock_request.return_value = {
         'user_id': '1',
         'balance': '48.80',
         'currency': 'RUB',
@@ -154,15 +370,67 @@ def test_get_price(request, client):
         price=600, price_single=0.2, period=15, count=200, currency='RUB'
     )
 
-    request.assert_called_once_with(
+    mock_request.assert_called_once_with(
         'getprice',
         params={'count': 200, 'period': 15, 'version': ProxyVersion.IPv4.value},
     )
 
 
-@mock.patch('proxy6.api.Proxy6._request')
-def test_get_count(request, client):
-    request.return_value = {
+@mock.patch('proxy6.api.time.monotonic')
+def test_get_price_cached(monotonic, mock_request, client):
+    """Prices should be cached for 5 minutes depending on call arguments"""
+    mock_request.return_value = {
+        'user_id': '1',
+        'balance': '48.80',
+        'currency': 'RUB',
+        'price': 1800,
+        'price_single': 0.6,
+        'period': 30,
+        'count': 100,
+    }
+    monotonic.return_value = 1000
+
+    price = client.get_price(count=100, period=30)
+    assert mock_request.call_count == 1
+
+    monotonic.return_value = 1299
+    assert client.get_price(count=100, period=30) is price
+    assert mock_request.call_count == 1
+
+    client.get_price(count=100, period=30, version=ProxyVersion.IPv4)
+    assert mock_request.call_count == 2
+
+    monotonic.return_value = 1300
+    assert client.get_price(count=100, period=30) == price
+    assert mock_request.call_count == 3
+
+
+@mock.patch('proxy6.api.time.monotonic')
+def test_cache_expired_entries(monotonic, mock_request, client):
+    """Expired entries should be dropped when the cache is updated"""
+    mock_request.return_value = {'count': 971}
+    monotonic.return_value = 1000
+
+    client.get_count(country='ru')
+    client.get_count(country='ua')
+    assert len(client._cache) == 2
+
+    monotonic.return_value = 1030
+    client.get_count(country='us')
+    assert list(client._cache) == [('get_count', frozenset({('country', 'us')}))]
+
+
+def test_get_countries_copied(mock_request, client):
+    """Cached countries lists should not be shared with callers"""
+    mock_request.return_value = {'list': ['ru', 'ua']}
+
+    client.get_countries().append('xx')
+    assert client.get_countries() == ['ru', 'ua']
+    assert mock_request.call_count == 1
+
+
+def test_get_count(mock_request, client):
+    mock_request.return_value = {
         'user_id': '1',
         'balance': '48.80',
         'currency': 'RUB',
@@ -171,10 +439,10 @@ def test_get_count(request, client):
 
     assert client.get_count(country='ru') == 971
 
-    request.assert_called_once_with('getcount', params={'country': 'ru'})
-    request.reset_mock()
+    mock_request.assert_called_once_with('getcount', params={'country': 'ru'})
+    mock_request.reset_mock()
 
-    request.return_value = {
+    mock_request.return_value = {
         'user_id': '1',
         'balance': '48.80',
         'currency': 'RUB',
@@ -183,14 +451,13 @@ def test_get_count(request, client):
 
     assert client.get_count(country='ru', version=ProxyVersion.IPv4) == 179
 
-    request.assert_called_once_with(
+    mock_request.assert_called_once_with(
         'getcount', params={'country': 'ru', 'version': ProxyVersion.IPv4.value}
     )
 
 
-@mock.patch('proxy6.api.Proxy6._request')
-def test_get_country(request, client):
-    request.return_value = {
+def test_get_country(mock_request, client):
+    mock_request.return_value = {
         'user_id': '1',
         'balance': '48.80',
         'currency': 'RUB',
@@ -199,10 +466,10 @@ def test_get_country(request, client):
 
     assert client.get_countries() == ['ru', 'ua', 'us']
 
-    request.assert_called_once_with('getcountry', params={})
-    request.reset_mock()
+    mock_request.assert_called_once_with('getcountry', params={})
+    mock_request.reset_mock()
 
-    request.return_value = {
+    mock_request.return_value = {
         'user_id': '1',
         'balance': '48.80',
         'currency': 'RUB',
@@ -211,14 +478,13 @@ def test_get_country(request, client):
 
     assert client.get_countries(version=ProxyVersion.IPv4) == ['de', 'fr', 'es']
 
-    request.assert_called_once_with(
+    mock_request.assert_called_once_with(
         'getcountry', params={'version': ProxyVersion.IPv4.value}
     )
 
 
-@mock.patch('proxy6.api.Proxy6._request')
-def test_get_proxies(request, client):
-    request.return_value = {
+def test_get_proxies(mock_request, client):
+    mock_request.return_value = {
         'user_id': '1',
         'balance': '48.80',
         'currency': 'RUB',
@@ -294,15 +560,15 @@ def test_get_proxies(request, client):
         ),
     ]
 
-    request.assert_called_once_with(
+    mock_request.assert_called_once_with(
         'getproxy',
         params={'state': ProxyState.ACTIVE.value, 'descr': "foo", 'nokey': True},
+        stream=True,
     )
 
 
-@mock.patch('proxy6.api.Proxy6._request')
-def test_set_type(request, client):
-    request.return_value = {'user_id': '1', 'balance': '48.80', 'currency': 'RUB'}
+def test_set_type(mock_request, client):
+    mock_request.return_value = {'user_id': '1', 'balance': '48.80', 'currency': 'RUB'}
 
     proxies = (
         ProxyFactory(id=10),
@@ -312,14 +578,13 @@ def test_set_type(request, client):
     )
     client.set_type(proxies=proxies, type=ProxyType.SOCKS5)
 
-    request.assert_called_once_with(
+    mock_request.assert_called_once_with(
         'settype', params={'ids': '10,11,12,15', 'type': ProxyType.SOCKS5.value}
     )
 
 
-@mock.patch('proxy6.api.Proxy6._request')
-def test_set_description(request, client):
-    request.return_value = {
+def test_set_description(mock_request, client):
+    mock_request.return_value = {
         'user_id': '1',
         'balance': '48.80',
         'currency': 'RUB',
@@ -334,14 +599,13 @@ def test_set_description(request, client):
     )
     assert client.set_description(proxies=proxies, old="test", new="newtest") == 4
 
-    request.assert_called_once_with(
+    mock_request.assert_called_once_with(
         'setdescr', params={'ids': '10,11,12,15', 'old': "test", 'new': "newtest"}
     )
 
 
-@mock.patch('proxy6.api.Proxy6._request')
-def test_buy(request, client):
-    request.return_value = {
+def test_buy(mock_request, client):
+    mock_request.return_value = {
         'user_id': '1',
         'balance': '48.80',
         'currency': 'RUB',
@@ -375,7 +639,7 @@ def test_buy(request, client):
         period=7,
         count=1,
         currency='RUB',
-        proxies=[
+        proxies=(
             Proxy(
                 id=15,
                 ip=ipaddress.ip_address('2a00:1838:32:19f:45fb:2640::330'),
@@ -390,14 +654,14 @@ def test_buy(request, client):
                 expires_at=datetime.datetime(2016, 7, 12, 11, 50, 41),
                 active=True,
                 description="",
-            )
-        ],
+            ),
+        ),
     )
 
-    request.assert_called_once_with(
+    mock_request.assert_called_once_with(
         'buy', params={'count': 1, 'period': 7, 'country': 'ru', 'nokey': True}
     )
-    request.reset_mock()
+    mock_request.reset_mock()
 
     client.buy(
         count=1,
@@ -409,7 +673,7 @@ def test_buy(request, client):
         auto_renew=True,
     )
 
-    request.assert_called_once_with(
+    mock_request.assert_called_once_with(
         'buy',
         params={
             'count': 1,
@@ -424,9 +688,8 @@ def test_buy(request, client):
     )
 
 
-@mock.patch('proxy6.api.Proxy6._request')
-def test_prolong(request, client):
-    request.return_value = {
+def test_prolong(mock_request, client):
+    mock_request.return_value = {
         'user_id': '1',
         'balance': 29,
         'currency': 'RUB',
@@ -461,12 +724,13 @@ def test_prolong(request, client):
     assert a.id == 15 and a.expires_at == datetime.datetime(2016, 7, 15, 6, 30, 27)
     assert b.id == 16 and b.expires_at == datetime.datetime(2016, 7, 16, 9, 31, 21)
 
-    request.assert_called_once_with('prolong', params={'period': 7, 'ids': '15,16'})
+    mock_request.assert_called_once_with(
+        'prolong', params={'period': 7, 'ids': '15,16'}
+    )
 
 
-@mock.patch('proxy6.api.Proxy6._request')
-def test_delete(request, client):
-    request.return_value = {
+def test_delete(mock_request, client):
+    mock_request.return_value = {
         'user_id': '1',
         'balance': '48.80',
         'currency': 'RUB',
@@ -476,12 +740,11 @@ def test_delete(request, client):
     proxies = (ProxyFactory(id=15), ProxyFactory(id=16))
     assert client.delete(proxies=proxies) == 2
 
-    request.assert_called_once_with('delete', params={'ids': '15,16'})
+    mock_request.assert_called_once_with('delete', params={'ids': '15,16'})
 
 
-@mock.patch('proxy6.api.Proxy6._request')
-def test_delete_by_description(request, client):
-    request.return_value = {
+def test_delete_by_description(mock_request, client):
+    mock_request.return_value = {
         'user_id': '1',
         'balance': '48.80',
         'currency': 'RUB',
@@ -490,12 +753,11 @@ def test_delete_by_description(request, client):
 
     assert client.delete_by_description(description="foo") == 2
 
-    request.assert_called_once_with('delete', params={'descr': "foo"})
+    mock_request.assert_called_once_with('delete', params={'descr': "foo"})
 
 
-@mock.patch('proxy6.api.Proxy6._request')
-def test_is_proxy_valid(request, client):
-    request.return_value = {
+def test_is_proxy_valid(mock_request, client):
+    mock_request.return_value = {
         'user_id': '1',
         'balance': '48.80',
         'currency': 'RUB',
@@ -505,4 +767,4 @@ def test_is_proxy_valid(request, client):
 
     assert client.is_proxy_valid(proxy_id=15)
 
-    request.assert_called_once_with('check', params={'ids': 15})
+    mock_request.assert_called_once_with('check', params={'ids': 15})
@@ -0,0 +1,14 @@
+from proxy6.errors import CountError, NoMoneyError, Proxy6Error, select
+
+
+def test_select():
+    error = select({'error_id': 400, 'error': "Error no money"})
+    assert isinstance(error, NoMoneyError)
+    assert error.code == 400
+
+    assert isinstance(select({'error_id': 200, 'error': "Error count"}), CountError)
+
+    error = select({'error_id': 123, 'error': "Lorem ipsum"})
+    assert type(error) is Proxy6Error
+    assert error.code == 123
+    assert str(error) == "Lorem ipsum (code 123)"
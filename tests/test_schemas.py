@@ -0,0 +1,83 @@
+import copy
+
+from proxy6 import schemas
+
+from .factories import ProxyFactory
+
+PROXY_DATA = {
+    'id': '11',
+    'ip': '2a00:1838:32:19f:45fb:2640::330',
+    'host': '185.22.134.250',
+    'port': '7330',
+    'user': '5svBNZ',
+    'pass': 'iagn2d',
+    'version': '6',
+    'type': 'http',
+    'country': 'ru',
+    'date': '2016-06-19 16:32:39',
+    'date_end': '2016-07-12 11:50:41',
+    'unixtime': 1466379159,
+    'unixtime_end': 1468349441,
+    'descr': "foo",
+    'active': '1',
+}
+
+PRICE_DATA = {
+    'user_id': '1',
+    'balance': '48.80',
+    'currency': 'RUB',
+    'price': 6.3,
+    'price_single': 0.9,
+    'period': 7,
+    'count': 1,
+}
+
+
+def test_load_price_information():
+    assert schemas.load_price_information(
+        PRICE_DATA
+    ) == schemas.PRICE_INFORMATION_SCHEMA.load(PRICE_DATA)
+
+
+def test_load_proxy():
+    """Generated loader should build the same proxies as the marshmallow schema"""
+    assert schemas.load_proxy(PROXY_DATA) == schemas.PROXY_SCHEMA.load(
+        copy.deepcopy(PROXY_DATA)
+    )
+
+    data = {**PROXY_DATA, 'ip': '123.234.213.0', 'version': '3', 'active': '0'}
+    assert schemas.load_proxy(data) == schemas.PROXY_SCHEMA.load(copy.deepcopy(data))
+
+
+def test_load_purchase():
+    proxy = {k: v for k, v in PROXY_DATA.items() if k not in ('country', 'descr')}
+    data = {**PRICE_DATA, 'country': 'ru', 'list': [proxy]}
+
+    purchase = schemas.load_purchase(copy.deepcopy(data), description="foo")
+    assert purchase == schemas.PURCHASE_SCHEMA.load(
+        {**copy.deepcopy(data), 'description': "foo"}
+    )
+    assert isinstance(purchase.proxies, tuple)
+    hash(purchase)
+
+
+def test_load_prolongation():
+    proxies = (ProxyFactory(id=15), ProxyFactory(id=16), ProxyFactory(id=17))
+    data = {
+        **PRICE_DATA,
+        'count': 2,
+        'list': {
+            '15': {'id': 15, 'date_end': '2016-07-15 06:30:27'},
+            '17': {'id': 17, 'date_end': '2016-07-16 09:31:21'},
+        },
+    }
+
+    prolongation = schemas.load_prolongation(copy.deepcopy(data), proxies)
+    assert prolongation == schemas.ProlongationSchema(proxies).load(copy.deepcopy(data))
+
+    assert isinstance(prolongation.proxies, tuple)
+    hash(prolongation)
+
+    a, b = prolongation.proxies
+    assert a.id == 15 and a.expires_at.isoformat() == '2016-07-15T06:30:27'
+    assert b.id == 17 and b.expires_at.isoformat() == '2016-07-16T09:31:21'
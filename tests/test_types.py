@@ -1,6 +1,42 @@
+import dataclasses
+import sys
+import typing
+
+import pytest
+
+from proxy6.types import Account, Proxy, ProxyState, ProxyType, Purchase
+
 from .factories import ProxyFactory
 
 
 def test_proxy_url():
     proxy = ProxyFactory(host='example.com', port=54321, user='alice', password='p')
     assert proxy.url == 'http://alice:p@example.com:54321'
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="requires dataclass slots")
+def test_proxy_slots():
+    proxy = ProxyFactory()
+    assert not hasattr(proxy, '__dict__')
+
+
+def test_proxy_frozen():
+    proxy = ProxyFactory(id=1)
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        proxy.id = 2
+
+    assert hash(proxy) == hash(Proxy(**dataclasses.asdict(proxy)))
+
+
+def test_str_enums():
+    """String enums members should be usable as their value"""
+    assert ProxyType.SOCKS5 == 'socks'
+    assert str(ProxyType.SOCKS5) == 'socks'
+    assert str(ProxyState.NOT_ACTIVE) == 'expiring'
+
+
+def test_type_hints():
+    """Annotations should resolve for code inspecting the dataclasses"""
+    for cls in (Account, Proxy, Purchase):
+        assert typing.get_type_hints(cls)